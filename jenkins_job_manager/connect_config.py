@@ -1,4 +1,5 @@
 import configparser
+import functools
 import hashlib
 import logging
 import os
@@ -7,6 +8,29 @@ import shlex
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("jjm")
 
+# bumped whenever jjm writes a config file itself
+_config_version = 0
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _positive_int(option, val):
+    """parse an optional config value that must be a whole number >= 1"""
+    if val is None or val == "":
+        return None
+    try:
+        num = int(val)
+    except ValueError:
+        num = 0
+    if num < 1:
+        raise ValueError(f"{option} must be a whole number >= 1, got {val!r}")
+    return num
+
 
 class JenkinsConnectConfig:
     """
@@ -16,10 +40,25 @@ class JenkinsConnectConfig:
 
     global_conf_path = "/etc/jjm/jenkins_creds.ini"
     user_conf_path = os.path.expanduser("~/.config/jjm/jenkins_creds.ini")
-    __slots__ = ("url", "username", "password", "timeout", "metadata", "allow_delete")
+    __slots__ = (
+        "url",
+        "username",
+        "password",
+        "timeout",
+        "metadata",
+        "allow_delete",
+        "parallelism",
+    )
 
     def __init__(
-        self, url, username, password, timeout=None, metadata=None, allow_delete=False
+        self,
+        url,
+        username,
+        password,
+        timeout=None,
+        metadata=None,
+        allow_delete=False,
+        parallelism=None,
     ):
         if url is not None and url.endswith("/"):
             url = url[:-1]
@@ -28,6 +67,8 @@ class JenkinsConnectConfig:
         self.timeout = int(timeout or 60)
         self.metadata = metadata or MetadataConfig({})
         self.allow_delete = allow_delete
+        # concurrent http requests, None leaves it up to the caller
+        self.parallelism = _positive_int("parallelism", parallelism)
 
     def __str__(self):
         return (
@@ -44,42 +85,27 @@ class JenkinsConnectConfig:
     def password_obscured(self):
         if self.password is None:
             return None
-        return "md5:" + hashlib.md5(self.password.encode("utf-8")).hexdigest()
+        digest = hashlib.blake2b(self.password.encode("utf-8"), digest_size=8)
+        return "b2:" + digest.hexdigest()
 
     @staticmethod
     def load_from_files(config_overrides=None):
         """loads config files in order, handles desired override structure"""
-        cp = configparser.RawConfigParser()
-        read_files = cp.read(
-            [
+        paths = tuple(
+            os.path.abspath(path)
+            for path in (
                 JenkinsConnectConfig.global_conf_path,
                 JenkinsConnectConfig.user_conf_path,
                 "./jjm.ini",
-            ]
-        )
-        # cli overrides
-        if config_overrides is not None:
-            cp.read_dict({"jenkins": config_overrides})
-        log.debug("loaded config: %r", read_files)
-        url = cp.get("jenkins", "url", fallback=None)
-        if not url:
-            log.warning("Jenkins url not set.")
-        elif url.endswith("/"):
-            url = url[:-1]
-        metadata = MetadataConfig.build_from_configparser(cp)
-
-        def _section_by_url(key):
-            return cp.get(url, key, fallback=None) or cp.get(
-                "jenkins", key, fallback=None
             )
-
-        loaded_config = JenkinsConnectConfig(
-            url=url,
-            username=_section_by_url("username"),
-            password=_section_by_url("password"),
-            timeout=_section_by_url("timeout"),
-            metadata=metadata,
         )
+        # reparse only when a file or the overrides changed
+        files_key = tuple((path, _mtime_ns(path)) for path in paths)
+        overrides_key = (
+            None if config_overrides is None else frozenset(config_overrides.items())
+        )
+        config_kwargs = _parse_config_files(files_key, overrides_key, _config_version)
+        loaded_config = JenkinsConnectConfig(**config_kwargs)
         log.debug("loaded config=%r", loaded_config)
         return loaded_config
 
@@ -94,6 +120,42 @@ class JenkinsConnectConfig:
         os.makedirs(os.path.dirname(self.user_conf_path), exist_ok=True)
         with open(self.user_conf_path, "w") as fp:
             cp.write(fp)
+        global _config_version
+        _config_version += 1
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_config_files(files_key, overrides_key, version):
+    """
+    parse the config files into JenkinsConnectConfig kwargs.
+    files_key holds (path, mtime) pairs, version only keys the cache.
+    """
+    cp = configparser.RawConfigParser()
+    read_files = cp.read([path for path, _ in files_key])
+    # cli overrides
+    if overrides_key is not None:
+        cp.read_dict({"jenkins": dict(overrides_key)})
+    log.debug("loaded config: %r", read_files)
+    url = cp.get("jenkins", "url", fallback=None)
+    if not url:
+        log.warning("Jenkins url not set.")
+    elif url.endswith("/"):
+        url = url[:-1]
+    metadata = MetadataConfig.build_from_configparser(cp)
+
+    # per-url values win over [jenkins] ones, unless empty
+    resolved = dict(cp.items("jenkins")) if cp.has_section("jenkins") else {}
+    if url and cp.has_section(url):
+        resolved.update((key, val) for key, val in cp.items(url) if val)
+
+    return dict(
+        url=url,
+        username=resolved.get("username") or None,
+        password=resolved.get("password") or None,
+        timeout=resolved.get("timeout") or None,
+        metadata=metadata,
+        parallelism=resolved.get("parallelism") or None,
+    )
 
 
 class MetadataConfig:
@@ -121,14 +183,16 @@ class MetadataConfig:
     def build_from_configparser(cp: configparser.RawConfigParser):
         if not cp.has_section("metadata"):
             return None
-        md_conf = {}
-        for key, val in cp.items(section="metadata"):
-            if (
-                key.startswith("valid-values-for-")
-                or key == "required-description-fields"
-            ):
-                val = shlex.split(val)
-            md_conf[key] = val
+        # only the required fields and their valid values are ever read
+        required = shlex.split(
+            cp.get("metadata", "required-description-fields", fallback="")
+        )
+        md_conf = {"required-description-fields": required}
+        for field in required:
+            key = f"valid-values-for-{field}".lower()
+            val = cp.get("metadata", key, fallback=None)
+            if val is not None:
+                md_conf[key] = shlex.split(val)
         return MetadataConfig(md_conf)
 
     def validate(self, md: dict):
@@ -6,27 +6,22 @@ from jenkins_job_manager.xml_change import (
     UPDATE,
     DELETE,
 )
-from jenkins_job_manager.raw_ext import (
-    RawXmlProject,
-    XmlJobGeneratorWithRaw,
-)
 
+import concurrent.futures
 import fnmatch
-import glob
+import functools
 import itertools
 import logging
 import os
-import random
 import re
-import string
-import xml.etree.ElementTree as ET
-from typing import Dict, Optional
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
 
-import jenkins
-import jinja2
-from jenkins_jobs.parser import YamlParser
-from jenkins_jobs.registry import ModuleRegistry
-from jenkins_jobs.xml_config import XmlJob, XmlViewGenerator
+# jenkins, jenkins_jobs and jinja2 pull in large import graphs (pkg_resources,
+# stevedore, yaml), they are imported where used to keep the cli startup fast
+if TYPE_CHECKING:
+    import jenkins
+    import jinja2
 
 HERE = os.path.dirname(os.path.realpath(__file__))
 J2_DIR = f"{HERE}/j2_templates"
@@ -34,27 +29,88 @@ J2_DIR = f"{HERE}/j2_templates"
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("jjm")
 
+# folder separators become underscores in imported file names
+_FOLDER_SEP_TABLE = str.maketrans("/", "_")
+
+
+@functools.lru_cache(maxsize=None)
+def _jinja_env() -> "jinja2.Environment":
+    """
+    shared environment, templates are compiled once per process since the
+    packaged templates don't change under us
+    """
+    import jinja2
+
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader([J2_DIR]),
+        undefined=jinja2.StrictUndefined,
+        autoescape=False,
+        auto_reload=False,
+    )
+
+
+# characters fnmatch treats specially, globs without them are plain names
+_GLOB_MAGIC = re.compile(r"[*?[]")
+
 
 class NameRegexFilter:
     """Regex Filter Callable"""
 
-    __slots__ = ("regex",)
+    __slots__ = ("regex", "literals")
 
-    def __init__(self, regexp):
-        self.regex = re.compile(regexp)
+    def __init__(self, regexp, literals=frozenset()):
+        # regexp=None only matches the literal names
+        self.regex = re.compile(regexp) if regexp is not None else None
+        self.literals = literals
 
     @staticmethod
     def from_glob_list(globs):
-        regexes = map(fnmatch.translate, globs)
-        combined_regex = "|".join(regexes)
-        return NameRegexFilter(combined_regex)
+        return _glob_list_filter(tuple(globs))
 
     def __call__(self, job_name):
-        m = self.regex.match(job_name)
-        return True if m is not None else False
+        if job_name in self.literals:
+            return True
+        return self.regex is not None and self.regex.match(job_name) is not None
 
     def __repr__(self):
-        return f"{self.__class__.__name__}<{repr(self.regex)[11:-1]}>"
+        regex = repr(self.regex)[11:-1] if self.regex is not None else None
+        if self.literals:
+            return f"{self.__class__.__name__}<{regex}, {sorted(self.literals)!r}>"
+        return f"{self.__class__.__name__}<{regex}>"
+
+
+def _yaml_dirs(path):
+    """
+    directories holding jjb yaml, depth first like glob("./**/") and
+    likewise skipping hidden and unreadable directories
+    """
+    has_yaml = False
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.name.startswith("."):
+                        subdirs.append(entry.path)
+                elif entry.name.endswith((".yml", ".yaml")):
+                    has_yaml = True
+    except OSError as e:
+        # unreadable directories are skipped, as glob does
+        log.debug("skipping %s: %s", path, e)
+        return
+    if has_yaml:
+        yield path
+    for subdir in subdirs:
+        yield from _yaml_dirs(subdir)
+
+
+@functools.lru_cache(maxsize=32)
+def _glob_list_filter(globs: tuple) -> NameRegexFilter:
+    """filters never change once built, so hand out one per glob list"""
+    literals = frozenset(glob for glob in globs if not _GLOB_MAGIC.search(glob))
+    patterns = [glob for glob in globs if glob not in literals]
+    regexp = "|".join(map(fnmatch.translate, patterns)) if patterns else None
+    return NameRegexFilter(regexp, literals)
 
 
 class JenkinsJobManager:
@@ -68,40 +124,52 @@ class JenkinsJobManager:
         "_jobs_filter_func",
         "views",
         "validation_errors",
-        "jenv",
     )
     job_managing_job_classes = frozenset(["jenkins.branch.OrganizationFolder"])
+    # concurrent http requests when fetching configs, unless configured
+    max_workers = 16
+    # concurrent config writes, these are heavier on the jenkins master
+    apply_workers = 8
     raw_xml_yaml_path = "./raw_xml_jobs.yaml"
 
     def __init__(self, config_overrides=None):
         self.config: JenkinsConnectConfig = JenkinsConnectConfig.load_from_files(
             config_overrides
         )
-        self._jenkins: Optional[jenkins.Jenkins] = None
+        self._jenkins: Optional["jenkins.Jenkins"] = None
         self.plugins_list: Optional[list] = None
         self.jobs: Dict[str, XmlChange] = XmlChangeDefaultDict()
         self._jobs_filter_func: NameRegexFilter = NameRegexFilter(".*")
         self.views: Dict[str, XmlChange] = XmlChangeDefaultDict()
         self.validation_errors = []
-        self.jenv = jinja2.Environment(
-            loader=jinja2.FileSystemLoader([J2_DIR]),
-            undefined=jinja2.StrictUndefined,
-            autoescape=False,
-        )
+
+    @property
+    def jenv(self) -> "jinja2.Environment":
+        return _jinja_env()
+
+    @property
+    def workers(self) -> int:
+        return self.config.parallelism or self.max_workers
 
     @property
     def jenkins(self):
         if self._jenkins is None:
-            self._jenkins = jenkins.Jenkins(
+            from jenkins_job_manager.jenkins_client import JenkinsClient
+
+            self._jenkins = JenkinsClient(
                 url=self.config.url,
                 username=self.config.username,
                 password=self.config.password,
                 timeout=self.config.timeout,
+                # the read pools plus the plugin list fetched alongside them
+                pool_maxsize=self.workers + 1,
             )
         return self._jenkins
 
     def check_authentication(self):
         """check if jenkins connection config correct"""
+        import jenkins
+
         log.debug("checking credentials")
         try:
             result = self.jenkins.get_whoami()
@@ -117,6 +185,7 @@ class JenkinsJobManager:
         jenkins = self.jenkins
         views = self.views
         log.info("Reading jenkins views state")
+        view_names = []
 
         for view_d in jenkins.get_views():
             log.debug("found view %r", view_d)
@@ -127,8 +196,12 @@ class JenkinsJobManager:
             if name == "All" or name == "all" or _class == "hudson.model.AllView":
                 log.debug("ignoring AllView: %r", view_d)
                 continue
-            view_config = jenkins.get_view_config(name)
-            views[name].before_xml = view_config
+            view_names.append(name)
+
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            view_confs = executor.map(jenkins.get_view_config, view_names)
+            for name, view_config in zip(view_names, view_confs):
+                views[name].before_xml = view_config
 
     def read_jobs(self):
         """read existing jobs from jenkins"""
@@ -136,34 +209,34 @@ class JenkinsJobManager:
         jobs = self.jobs
 
         log.info("Reading jenkins jobs state")
-        # ignorable subfolder jobs
-        managed_job_urls = set()
-        _empty = tuple()
-        for d in jenkins.get_all_jobs():
+
+        def descend(d):
+            """jobs under a managing job are its business, don't list them"""
+            if d.get("_class") in self.job_managing_job_classes:
+                return not self._jobs_filter_func(d["fullname"])
+            return True
+
+        job_names = []
+        for d in jenkins.get_all_jobs(descend=descend):
             log.debug("found job %r", d)
-            name, url, _class = d["fullname"], d["url"], d.get("_class")
-            subjobs = d.get("jobs", _empty)
+            name = d["fullname"]
             if not self._jobs_filter_func(name):
                 log.debug("Ignored by filter: %s", name)
                 continue
-            elif _class in self.job_managing_job_classes:
-                managed_job_urls.update(job_d["url"] for job_d in subjobs)
-            elif url in managed_job_urls:
-                log.debug("Ignoring managed job %s", name)
-                # recursively ignore jobs of ignored jobs
-                managed_job_urls.update(job_d["url"] for job_d in subjobs)
-                continue
-            job_conf = jenkins.get_job_config(name)
-            jobs[name].before_xml = job_conf
+            job_names.append(name)
+
+        # each config is a separate request, fetch them concurrently
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            job_confs = executor.map(jenkins.get_job_config, job_names)
+            for name, job_conf in zip(job_names, job_confs):
+                jobs[name].before_xml = job_conf
 
     def load_plugins_list(self):
-        """load plugin info in format expected by jjb libs"""
+        """load plugin info in format expected by jjb libs, fetched once"""
+        if self.plugins_list is not None:
+            return
         log.debug("reading jenkins plugins")
-        self.plugins_list = list(self.jenkins.get_plugins().values())
-
-    @staticmethod
-    def xml_dump(root: ET.Element) -> str:
-        return ET.tostring(root, encoding="unicode")
+        self.plugins_list = self.jenkins.get_plugins_list()
 
     def get_jjb_config(self):
         class JJBConfig:
@@ -180,42 +253,16 @@ class JenkinsJobManager:
 
         return JJBConfig
 
-    def jenkins_format_xml(self, xml_job: XmlJob):
-        """
-        bounces job config through jenkins to get the formatting right
-        unused, deprecated
-        """
-        jenkins = self.jenkins
-        _xml: ET.Element = xml_job.xml
-
-        if not _xml.find("./disabled"):
-            d = ET.Element("disabled")
-            d.text = "false"
-            _xml.append(d)
-        disabled_job = _xml.find("./disabled").text == "true"
-
-        rand_suffix = "".join(random.choice(string.hexdigits) for _ in range(10))
-        tmp_name = f"zz_jjm_tmp_{xml_job.name}_{rand_suffix}"
-        tmp_xml = xml_job.xml
-        tmp_xml.find("./disabled").text = "true"
-        tmp_xml_str = ET.tostring(tmp_xml, encoding="unicode")
-        log.info("creating %s", tmp_name)
-        jenkins.create_job(tmp_name, tmp_xml_str)
-        formatted_xml = jenkins.get_job_config(tmp_name)
-        log.info("removing %s", tmp_name)
-        jenkins.delete_job(tmp_name)
-        if not disabled_job:
-            formatted_xml = formatted_xml.replace(
-                "<disabled>true</disabled>", "<disabled>false</disabled>"
-            )
-        return formatted_xml
-
     def generate_jjb_xml(self):
         """render jjb yaml to xml"""
+        from jenkins_jobs.parser import YamlParser
+        from jenkins_jobs.registry import ModuleRegistry
+        from jenkins_jobs.xml_config import XmlViewGenerator
+        from jenkins_job_manager.raw_ext import XmlJobGeneratorWithRaw
 
         jjb_config = self.get_jjb_config()
         options_names = []  # normally a list of jobs globs for targeting
-        files_path = glob.glob("./**/", recursive=True)
+        files_path = list(_yaml_dirs("."))
 
         parser = YamlParser(jjb_config)
         registry = ModuleRegistry(jjb_config, self.plugins_list)
@@ -236,15 +283,14 @@ class JenkinsJobManager:
         )
         jobs = self.jobs
         for xml_job in xml_jobs:
-            formatted_xml_str = self.xml_dump(xml_job.xml)
-            jobs[xml_job.name].after_xml = formatted_xml_str
+            jobs[xml_job.name].after_from_element(xml_job.xml)
 
         xml_views = xml_view_generator.generateXML(
             filter(job_data_filter_wrapper, view_data_list)
         )
         views = self.views
         for xml_view in xml_views:
-            views[xml_view.name].after_xml = self.xml_dump(xml_view.xml)
+            views[xml_view.name].after_from_element(xml_view.xml)
 
     def detected_changes(self):
         return any(
@@ -257,13 +303,20 @@ class JenkinsJobManager:
         if target_job_names:
             log.debug("target_job_names=%r", target_job_names)
             self._jobs_filter_func = NameRegexFilter.from_glob_list(target_job_names)
-        self.read_views()
-        self.read_jobs()
-        self.load_plugins_list()
+        # build the lazy client here, the threads below must not race to do it
+        self.jenkins
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            # a single independent request, overlap it with the config reads
+            plugins_loaded = executor.submit(self.load_plugins_list)
+            self.read_views()
+            self.read_jobs()
+            plugins_loaded.result()
         self.generate_jjb_xml()
 
     def import_missing(self) -> list:
         """import missing jobs as xml"""
+        from jenkins_jobs.parser import YamlParser
+
         missing = [item for item in self.jobs.values() if item.changetype() is DELETE]
         if not missing:
             return []
@@ -272,19 +325,21 @@ class JenkinsJobManager:
             modules = []
 
         def job_name_to_file_name(j_name):
-            _part = re.sub(r"[\/]", "_", j_name)
+            _part = j_name.translate(_FOLDER_SEP_TABLE)
             return f"./{_part}.xml"
 
         xml_job_name_pairs = []
+        # one directory listing instead of a stat per job
+        existing_files = set(os.listdir("."))
 
-        if os.path.exists(self.raw_xml_yaml_path):
+        if os.path.basename(self.raw_xml_yaml_path) in existing_files:
             parser = YamlParser(self.get_jjb_config())
             parser.load_files([self.raw_xml_yaml_path])
             job_data_list, _ = parser.expandYaml(FakeRegistry, [])
             for job_data in job_data_list:
                 name = job_data["name"]
                 fname = job_name_to_file_name(name)
-                assert os.path.exists(fname)
+                assert os.path.basename(fname) in existing_files
                 xml_job_name_pairs.append((name, fname))
         template = self.jenv.get_template("raw_xml_import.j2")
 
@@ -293,7 +348,8 @@ class JenkinsJobManager:
             file_name = job_name_to_file_name(job_name)
             job_config = mxml.before_xml
             xml_job_name_pairs.append((job_name, file_name))
-            assert not os.path.exists(file_name)
+            assert os.path.basename(file_name) not in existing_files
+            existing_files.add(os.path.basename(file_name))
             with open(file_name, "w") as fp:
                 fp.write(job_config)
             log.info("Imported %s to %s", job_name, file_name)
@@ -304,14 +360,15 @@ class JenkinsJobManager:
 
     def validate_metadata(self):
         md_conf = self.config.metadata
+        if not (md_conf.required_fields or md_conf.valid_field_values):
+            # nothing to check, skip reading every description
+            return
 
         for job in self.jobs.values():
             if job.after_xml is None:
                 continue
             md = job.extract_md()
-            warnings = md_conf.validate(md)
-            for warning in warnings:
-                yield job.name, warning
+            yield from ((job.name, warning) for warning in md_conf.validate(md))
 
     def plan_report(self, report_format=None):
         """report on changes about to be made"""
@@ -320,91 +377,129 @@ class JenkinsJobManager:
         elif report_format == "yaml":
             template_name = "yaml.j2"
         else:
-            template_name = "default.j2"
+            return self._plan_report_diff()
         template = self.jenv.get_template(template_name)
 
-        changecounts = {CREATE: [], UPDATE: [], DELETE: []}
-
-        def iter_changes(xml_dict, output=None):
-            """closure to handle changecount side effect"""
-
+        def iter_changes(xml_dict):
             for item in xml_dict.values():
                 changetype = item.changetype()
                 if changetype is None:
                     continue
-                if output:
-                    md = item.extract_md() or {}
-                    yield item.name, item.before_xml, item.after_xml, item.difflines(), md, item.changetype()
-                else:
-                    for i, line in enumerate(item.difflines()):
-                        # deals with the rare case that the diff shows no lines
-                        if i == 0:
-                            changecounts[changetype].append(item.name)
-                        yield line
-
-        report_context = {
-            "view_changes": iter_changes(self.views),
-            "job_changes": iter_changes(self.jobs, report_format),
-            "changecounts": changecounts,
-        }
+                md = item.extract_md() or {}
+                yield item.name, item.before_xml, item.after_xml, item.difflines(), md, changetype
+
+        report_context = {"job_changes": iter_changes(self.jobs)}
 
         return template.generate(
             obj=report_context, CREATE=CREATE, UPDATE=UPDATE, DELETE=DELETE
         )
 
-    def apply_plan(self):
-        """apply changes from gather/plan"""
-        changecounts = {CREATE: 0, UPDATE: 0, DELETE: 0}
-        log.debug("applying views")
-        for view in self.views.values():
-            changetype = view.changetype()
-            if changetype is None:
-                log.debug("no change: %s", view.name)
-                continue
-            elif changetype is CREATE:
-                log.info("create view %s", view.name)
-                self.jenkins.create_view(view.name, view.after_xml)
-                changecounts[CREATE] += 1
-            elif changetype is UPDATE:
-                log.info("reconfig view %s", view.name)
-                self.jenkins.reconfig_view(view.name, view.after_xml)
-                changecounts[UPDATE] += 1
-            elif changetype is DELETE:
-                log.info("delete view %s", view.name)
-                if self.config.allow_delete:
-                    self.jenkins.delete_view(view.name)
-                else:
-                    log.warning("refusing to delete view %s", view.name)
-                changecounts[DELETE] += 1
+    def _plan_report_diff(self):
+        """stream diff lines straight through, only the summary is templated"""
+        changecounts = {CREATE: [], UPDATE: [], DELETE: []}
+        for xml_dict in (self.views, self.jobs):
+            for item in xml_dict.values():
+                changetype = item.changetype()
+                if changetype is None:
+                    continue
+                for i, line in enumerate(item.difflines()):
+                    # deals with the rare case that the diff shows no lines
+                    if i == 0:
+                        changecounts[changetype].append(item.name)
+                    yield f"{line}\n"
+
+        template = self.jenv.get_template("default.j2")
+        yield from template.generate(
+            changecounts=changecounts, CREATE=CREATE, UPDATE=UPDATE, DELETE=DELETE
+        )
+
+    def _apply_changes(self, kind, items, create, reconfig, delete, changecounts):
+        """
+        push view or job changes to jenkins concurrently. Writes go parent
+        folders first, deletes go children first since deleting a folder
+        takes its children with it.
+        """
+
+        def delete_allowed(name, _xml):
+            if self.config.allow_delete:
+                delete(name)
             else:
-                raise RuntimeError(
-                    f"Invalid changetype {changetype}(id={id(changetype)})"
-                )
-        log.debug("applying jobs")
-        for job in self.jobs.values():
-            changetype = job.changetype()
+                log.warning("refusing to delete %s %s", kind, name)
+
+        operations = {
+            CREATE: ("create", create),
+            UPDATE: ("reconfig", reconfig),
+            DELETE: ("delete", delete_allowed),
+        }
+        writes, deletes = [], []
+        for item in items:
+            changetype = item.changetype()
             if changetype is None:
-                log.debug("no change: %s", job.name)
+                log.debug("no change: %s", item.name)
                 continue
-            elif changetype is CREATE:
-                log.info("create job %s", job.name)
-                self.jenkins.create_job(job.name, job.after_xml)
-                changecounts[CREATE] += 1
-            elif changetype is UPDATE:
-                log.info("reconfig job %s", job.name)
-                self.jenkins.reconfig_job(job.name, job.after_xml)
-                changecounts[UPDATE] += 1
-            elif changetype is DELETE:
-                log.info("delete job %s", job.name)
-                if self.config.allow_delete:
-                    self.jenkins.delete_job(job.name)
-                else:
-                    log.warning("refusing to delete job %s", job.name)
-                changecounts[DELETE] += 1
-            else:
+            elif changetype not in operations:
                 raise RuntimeError(
                     f"Invalid changetype {changetype}(id={id(changetype)})"
                 )
+            changecounts[changetype] += 1
+            task = (operations[changetype], item)
+            (deletes if changetype is DELETE else writes).append(task)
+
+        failed = threading.Event()
+
+        def apply_one(task):
+            # a worker can pick up a task before the failed batch is cancelled
+            if failed.is_set():
+                return
+            (verb, operation), item = task
+            log.info("%s %s %s", verb, kind, item.name)
+            try:
+                operation(item.name, item.after_xml)
+            except Exception:
+                failed.set()
+                raise
+
+        def folder_depth(task):
+            return task[1].name.count("/")
+
+        writes.sort(key=folder_depth)
+        deletes.sort(key=folder_depth, reverse=True)
+        workers = min(self.apply_workers, self.workers)
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            for tasks in (writes, deletes):
+                for _, batch in itertools.groupby(tasks, key=folder_depth):
+                    futures = [executor.submit(apply_one, task) for task in batch]
+                    done, pending = concurrent.futures.wait(
+                        futures, return_when=concurrent.futures.FIRST_EXCEPTION
+                    )
+                    # stop the rest of the batch on the first failure
+                    for future in pending:
+                        future.cancel()
+                    for future in done:
+                        future.result()
+
+    def apply_plan(self):
+        """apply changes from gather/plan"""
+        changecounts = {CREATE: 0, UPDATE: 0, DELETE: 0}
+        jenkins = self.jenkins
+        log.debug("applying views")
+        self._apply_changes(
+            "view",
+            self.views.values(),
+            jenkins.create_view,
+            jenkins.reconfig_view,
+            jenkins.delete_view,
+            changecounts,
+        )
+        log.debug("applying jobs")
+        self._apply_changes(
+            "job",
+            self.jobs.values(),
+            jenkins.create_job,
+            jenkins.reconfig_job,
+            jenkins.delete_job,
+            changecounts,
+        )
         msg = (
             f"Changes applied. added={changecounts[CREATE]} updated={changecounts[UPDATE]}"
             f" deleted={changecounts[DELETE]}"
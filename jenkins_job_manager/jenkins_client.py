@@ -0,0 +1,107 @@
+"""
+Contains extensions to the python-jenkins client
+"""
+import json
+from http.client import BadStatusLine
+from urllib.parse import quote
+
+import jenkins
+import requests
+import requests.adapters
+import requests.exceptions
+
+try:
+    # optional, decodes large api responses several times faster
+    import orjson
+except ImportError:
+    orjson = None
+
+json_loads = json.loads if orjson is None else orjson.loads
+
+# read_jobs only needs these, jenkins always includes _class
+JOBS_QUERY_TREE = "jobs[name,url,%s]"
+# jjb's ModuleRegistry only reads these plugin fields
+PLUGINS_QUERY = "pluginManager/api/json?tree=plugins[shortName,longName,version]"
+
+
+class JenkinsClient(jenkins.Jenkins):
+    """python-jenkins client with a sized connection pool and trimmed job queries"""
+
+    def __init__(self, *args, pool_maxsize=10, **kwargs):
+        super().__init__(*args, **kwargs)
+        # one pooled connection per worker thread
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def get_info(self, item="", query=None):
+        """same as python-jenkins, but decodes the raw response bytes"""
+        url = quote("/".join((item, jenkins.INFO)).lstrip("/"))
+        if query:
+            url += query
+        try:
+            response = self.jenkins_request(
+                requests.Request("GET", self._build_url(url))
+            )
+            return json_loads(response.content)
+        except (requests.exceptions.HTTPError, BadStatusLine):
+            raise jenkins.BadHTTPException(
+                f"Error communicating with server[{self.server}]"
+            )
+        except ValueError:
+            raise jenkins.JenkinsException(
+                f"Could not parse JSON info for server[{self.server}]"
+            )
+
+    def get_plugins_list(self):
+        """plugin info as plain dicts, in the list format jjb expects"""
+        try:
+            response = self.jenkins_request(
+                requests.Request("GET", self._build_url(PLUGINS_QUERY))
+            )
+            return json_loads(response.content)["plugins"]
+        except (requests.exceptions.HTTPError, BadStatusLine):
+            raise jenkins.BadHTTPException(
+                f"Error communicating with server[{self.server}]"
+            )
+        except ValueError:
+            raise jenkins.JenkinsException(
+                f"Could not parse JSON info for server[{self.server}]"
+            )
+
+    def get_all_jobs(
+        self, folder_depth=None, folder_depth_per_request=10, descend=None
+    ):
+        """
+        Same folder walk as python-jenkins, but the tree query only asks for
+        the fields we use, which shrinks the response on large instances.
+        Folders for which descend(job) is false are listed without their jobs.
+        """
+        jobs_query = "jobs"
+        for _ in range(folder_depth_per_request):
+            jobs_query = JOBS_QUERY_TREE % jobs_query
+        jobs_query = f"?tree={jobs_query}"
+
+        jobs_list = []
+        jobs = [(0, [], self.get_info(query=jobs_query)["jobs"])]
+        for lvl, root, lvl_jobs in jobs:
+            # as upstream, a lone job may come back as an object, not a list
+            if not isinstance(lvl_jobs, list):
+                lvl_jobs = [lvl_jobs]
+            for job in lvl_jobs:
+                path = root + [job["name"]]
+                job.setdefault("fullname", "/".join(path))
+                jobs_list.append(job)
+                children = job.get("jobs")
+                if not isinstance(children, list):
+                    continue
+                if folder_depth is not None and lvl >= folder_depth:
+                    continue
+                if descend is not None and not descend(job):
+                    continue
+                # past folder_depth_per_request jenkins returns empty objects
+                if any("url" not in child for child in children):
+                    url_path = "".join(f"/job/{p}" for p in path)
+                    children = self.get_info(url_path, query=jobs_query)["jobs"]
+                jobs.append((lvl + 1, path, children))
+        return jobs_list
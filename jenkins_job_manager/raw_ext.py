@@ -1,6 +1,7 @@
 """
 Contains extensions for raw xml loading with jjb
 """
+import itertools
 import os
 import logging
 import jinja2
@@ -48,13 +49,19 @@ class RawXmlProject(jenkins_jobs.modules.base.Base):
 class XmlJobGeneratorWithRaw(XmlJobGenerator):
     """bypasses the module loader for the raw xml job type"""
 
+    def __init__(self, registry):
+        super().__init__(registry)
+        # stateless, so one instance serves every raw job
+        self.raw_module = RawXmlProject(registry)
+
     def _annotate_with_plugins(self, xml_job: XmlJob):
         """Many elements coming out of jjb are missing plugin version data."""
         plugins: dict = self.registry.plugins_dict
         doc: ET.Element = xml_job.xml
-        for node in doc.iterfind(".//*[@plugin]"):
-            plugin_name = node.attrib["plugin"]
-            if "@" in plugin_name:
+        # plain iteration skips the xpath engine, descendants only like .//*
+        for node in itertools.chain.from_iterable(map(ET.Element.iter, doc)):
+            plugin_name = node.get("plugin")
+            if plugin_name is None or "@" in plugin_name:
                 continue
             version = plugins[plugin_name]["version"]
             log.debug("annotated %r with %s@%s", node, plugin_name, version)
@@ -63,8 +70,7 @@ class XmlJobGeneratorWithRaw(XmlJobGenerator):
     def _getXMLForData(self, data):
         kind = data.get(self.kind_attribute, self.kind_default)
         if kind == "raw":
-            mod = RawXmlProject(self.registry)
-            _xml = mod.root_xml(data)
+            _xml = self.raw_module.root_xml(data)
             obj = XmlJob(_xml, data["name"])
             return obj
         xml_job = super(XmlJobGenerator, self)._getXMLForData(data)
@@ -1,22 +1,157 @@
 import difflib
-import operator
-import xml.dom.minidom
+import io
 import xml.etree.ElementTree as ET
 import re
 import logging
 
-from collections import defaultdict
-from xml.dom import Node
+from typing import Optional, Union
+
+import lxml.etree
+
+try:
+    # optional C implementation, same api as difflib.SequenceMatcher
+    from cdifflib import CSequenceMatcher as _SequenceMatcher
+except ImportError:
+    _SequenceMatcher = difflib.SequenceMatcher
 
 # constants used for enums herein
 CREATE, UPDATE, DELETE = "create", "update", "delete"
+_UNSET = object()
 log = logging.getLogger("jjm")
 
+XML_DECLARATION = '<?xml version="1.0" ?>\n'
+# jjb appends this to every description it writes
+_JJB_MANAGED_MARKER = "<!-- Managed by Jenkins Job Builder -->"
+# one `key: value` metadata line of a job description
+_MD_LINE_RE = re.compile(r"\s*([\w-]+):\s*([\w -]+)\s*\Z")
+# blank text between elements is dropped by libxml2 at parse time
+_XML_PARSER = lxml.etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+
+
+def _node_name(node) -> str:
+    """sort key for child nodes, comments sort as '#comment'"""
+    return node.tag if isinstance(node.tag, str) else "#comment"
+
+
+def _normalized_tostring(root) -> str:
+    """sort sortable nodes of a whitespace-stripped lxml tree and pretty print it"""
+    # sort child elements for consistency
+    for node in list(root.iter(*XmlChange.sortable_node_names)):
+        node[:] = sorted(node, key=_node_name)
+    pretty = lxml.etree.tostring(root, pretty_print=True, encoding="unicode")
+    return XML_DECLARATION + pretty
+
+
+def _xml_normalize(xml_data: Union[str, bytes]) -> str:
+    """Normalize xml by running through a parser and removing blank text elements."""
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+    root = lxml.etree.fromstring(xml_data, _XML_PARSER)
+    for node in root.iter():
+        if node.text and isinstance(node.tag, str):
+            node.text = node.text.strip() or None
+        if node.tail:
+            node.tail = node.tail.strip() or None
+    return _normalized_tostring(root)
+
+
+def _copy_stripped(elem: ET.Element, parent=None):
+    """copy an ElementTree tree into lxml, stripping text like _xml_normalize"""
+    if elem.tag is ET.Comment:
+        node = lxml.etree.Comment(elem.text)
+        if parent is not None:
+            parent.append(node)
+    else:
+        if parent is None:
+            node = lxml.etree.Element(elem.tag, elem.attrib)
+        else:
+            node = lxml.etree.SubElement(parent, elem.tag, elem.attrib)
+        if elem.text:
+            node.text = elem.text.strip() or None
+    if elem.tail and parent is not None:
+        node.tail = elem.tail.strip() or None
+    for child in elem:
+        _copy_stripped(child, node)
+    return node
+
+
+def xml_normalize_element(elem: ET.Element) -> str:
+    """
+    Same output as xml_normalize, but for an ElementTree element.
+    Skips serializing the tree only to have libxml2 parse it again.
+    """
+    return _normalized_tostring(_copy_stripped(elem))
+
+
+def _find_description(xml: str) -> Optional[str]:
+    """text of the top level <description>, stops parsing once it's found"""
+    depth = 0
+    for event, elem in ET.iterparse(io.StringIO(xml), events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1 and elem.tag == "description":
+            return elem.text
+    return None
+
+
+def _format_range(start: int, stop: int) -> str:
+    """unified diff hunk range, as difflib formats it"""
+    beginning, length = start + 1, stop - start
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _unified_diff(a, b, name: str, n: int = 3):
+    """
+    difflib.unified_diff, with the sequence matcher picked at import
+
+    difflib.unified_diff always uses difflib.SequenceMatcher, this uses the
+    cdifflib one when it is installed without patching difflib for everyone.
+    """
+    matcher = _SequenceMatcher(None, a, b)
+    for i, group in enumerate(matcher.get_grouped_opcodes(n)):
+        if not i:
+            yield f"--- {name}\n"
+            yield f"+++ {name}\n"
+        first, last = group[0], group[-1]
+        yield "@@ -{} +{} @@\n".format(
+            _format_range(first[1], last[2]), _format_range(first[3], last[4])
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                yield from (" " + line for line in a[i1:i2])
+                continue
+            if tag in ("replace", "delete"):
+                yield from ("-" + line for line in a[i1:i2])
+            if tag in ("replace", "insert"):
+                yield from ("+" + line for line in b[j1:j2])
+
+
+def _split_lines(xml: Optional[str]) -> tuple:
+    """split normalized xml on newlines, it always ends with one"""
+    if not xml:
+        return ()
+    return tuple(xml[:-1].split("\n") if xml[-1] == "\n" else xml.split("\n"))
+
 
 class XmlChange:
     """Represents an xml job/view with current and new state."""
 
-    __slots__ = ("name", "_before", "_after")
+    __slots__ = (
+        "name",
+        "_before",
+        "_after",
+        "_before_lines",
+        "_after_lines",
+        "_changetype",
+        "_description",
+        "_md",
+    )
 
     sortable_node_names = {
         "project",
@@ -30,64 +165,61 @@ class XmlChange:
             raise ValueError("Name must be set")
         self._before = None
         self._after = None
+        self._before_lines = None
+        self._after_lines = None
+        self._changetype = _UNSET
+        self._description = _UNSET
+        self._md = None
 
-    @staticmethod
-    def xml_normalize(xml_str: str) -> str:
-        """Normalize xml by running through a parser and removing blank text elements."""
-        root = xml.dom.minidom.parseString(xml_str)
-        # remove blanks
-        node_queue = [root]
-        while node_queue:
-            node = node_queue.pop()
-
-            if node.nodeName in XmlChange.sortable_node_names:
-                # sort child elements for consistency
-                node.childNodes.sort(key=operator.attrgetter("nodeName"))
-
-            for n in node.childNodes:
-                if n.nodeType is Node.TEXT_NODE and n.nodeValue:
-                    n.nodeValue = n.nodeValue.strip()
-                elif n.nodeType is Node.ELEMENT_NODE:
-                    node_queue.append(n)
-
-        root.normalize()
-        return root.toprettyxml(indent="  ")
+    xml_normalize = staticmethod(_xml_normalize)
 
     def extract_md(self):
+        # memoized, the after setters reset it
+        if self._md is None:
+            self._md = self._parse_md()
+        return self._md
+
+    def _parse_md(self):
         if not self._after:
             return {}
-        node = ET.fromstring(self._after)
-        desc = node.find("./description")
-        if desc is None or not desc.text:
+        text = self._description
+        if text is _UNSET:
+            text = _find_description(self._after)
+        if not text:
             log.warning("No description in jenkins job %r??", self.name)
             return {}
-        text = desc.text.replace("<!-- Managed by Jenkins Job Builder -->", "")
-        md = {
-            m.group(1): m.group(2)
-            for m in re.finditer(r"^\s*([\w-]+):\s*([\w -]+)\s*$", text, flags=re.M)
-        }
+        text = text.replace(_JJB_MANAGED_MARKER, "")
+        md = {}
+        for line in text.splitlines():
+            m = _MD_LINE_RE.match(line)
+            if m is not None:
+                md[m.group(1)] = m.group(2)
         return md
 
     def changetype(self):
-        if self._before == self._after:
-            # No change
+        # memoized, the setters reset it
+        if self._changetype is not _UNSET:
+            return self._changetype
+        before, after = self._before, self._after
+        if before is after:
+            # No change, the setters share one string when equal
             ret = None
-        elif not self._before and self._after:
+        elif before is None:
             ret = CREATE
-        elif self._before and not self._after:
+        elif after is None:
             ret = DELETE
         else:
             ret = UPDATE
+        self._changetype = ret
         return ret
 
     def difflines(self):
-        difflines = difflib.unified_diff(
-            (self._before or "").splitlines(),
-            (self._after or "").splitlines(),
-            fromfile=self.name,
-            tofile=self.name,
-        )
-        return difflines
+        # split once, plan_report may diff the same change more than once
+        if self._before_lines is None:
+            self._before_lines = _split_lines(self._before)
+        if self._after_lines is None:
+            self._after_lines = _split_lines(self._after)
+        return _unified_diff(self._before_lines, self._after_lines, self.name)
 
     @property
     def before_xml(self):
@@ -97,16 +229,41 @@ class XmlChange:
     def after_xml(self):
         return self._after
 
+    @staticmethod
+    def _shared(val: str, other: Optional[str]) -> str:
+        """reuse the other side's string when equal, unchanged items keep one copy"""
+        return other if val == other else val
+
     @before_xml.setter
     def before_xml(self, val):
-        self._before = self.xml_normalize(val)
+        self._before = self._shared(self.xml_normalize(val), self._after)
+        self._before_lines = None
+        self._changetype = _UNSET
 
     @after_xml.setter
     def after_xml(self, val):
-        self._after = self.xml_normalize(val)
+        self._set_after(self.xml_normalize(val))
+
+    def after_from_element(self, elem: ET.Element):
+        """set after_xml from a generated element without serializing it first"""
+        # keep the description so extract_md doesn't have to parse after_xml
+        desc = elem.find("./description")
+        description = None if desc is None else desc.text
+        self._set_after(xml_normalize_element(elem), description)
+
+    def _set_after(self, normalized: str, description=_UNSET):
+        self._after = self._shared(normalized, self._before)
+        self._after_lines = None
+        self._changetype = _UNSET
+        self._description = description
+        self._md = None
+
+
+class XmlChangeDefaultDict(dict):
+    """dict creating XmlChange items on first lookup, hits stay in C"""
 
+    __slots__ = ()
 
-class XmlChangeDefaultDict(defaultdict):
     def __missing__(self, key):
         val = XmlChange(name=key)
         self[key] = val
@@ -0,0 +1,74 @@
+import pathlib
+from unittest import mock
+
+import click.testing
+import pytest
+
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    tomllib = None
+
+PROJECT_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+# patched in jenkins_job_manager.cli for the cli tests, in fixture order
+CLI_MOCK_NAMES = (
+    "JenkinsJobManager",
+    "jjm_check",
+    "check_auth",
+    "handle_validation_errors",
+    "handle_plan_report",
+    "log",
+)
+
+
+@pytest.fixture(scope="session")
+def cli_module():
+    """imported on first use, so filtered runs skip loading the app"""
+    import jenkins_job_manager.cli
+
+    return jenkins_job_manager.cli
+
+
+@pytest.fixture(scope="session")
+def jjm(cli_module):
+    return cli_module.jjm
+
+
+@pytest.fixture(scope="session")
+def cli_autospecs(cli_module):
+    """autospec introspection is slow, build the mocks once per session"""
+    return tuple(
+        mock.create_autospec(getattr(cli_module, name)) for name in CLI_MOCK_NAMES
+    )
+
+
+@pytest.fixture
+def cli_mocks(cli_module, cli_autospecs, monkeypatch):
+    """the session mocks, reset and installed into jenkins_job_manager.cli"""
+    for name, cli_mock in zip(CLI_MOCK_NAMES, cli_autospecs):
+        cli_mock.reset_mock()
+        monkeypatch.setattr(cli_module, name, cli_mock)
+    return cli_autospecs
+
+
+@pytest.fixture(scope="session")
+def pyproject():
+    """pyproject.toml, parsed once per session"""
+    text = PROJECT_DIR.joinpath("pyproject.toml").read_text()
+    if tomllib is not None:
+        return tomllib.loads(text)
+    import tomlkit
+
+    return tomlkit.parse(text)
+
+
+@pytest.fixture(scope="session")
+def pyproject_version(pyproject):
+    return pyproject["tool"]["poetry"]["version"]
+
+
+@pytest.fixture(scope="session")
+def cli_runner():
+    """CliRunner keeps no state between invocations, one serves every test"""
+    return click.testing.CliRunner()
@@ -1,347 +1,185 @@
 from functools import partial
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Mapping, Optional
 import logging
-import os
 import pytest
-from unittest import mock
 import json
 
-import click.testing
-import tomlkit
-
-from jenkins_job_manager.cli import jjm
-
-HERE = os.path.dirname(os.path.realpath(__file__))
-PROJECT_DIR = os.path.realpath(HERE + "/../")
+import attr
 
 
 @pytest.mark.skip("only tests virtual environment, not code")
-def test_version():
+def test_version(pyproject_version):
     from jenkins_job_manager import __version__
 
-    with open(f"{PROJECT_DIR}/pyproject.toml") as fp:
-        doc = tomlkit.parse(fp.read())
-    print(doc)
-    toml_version = doc["tool"]["poetry"]["version"]
-    assert __version__ == toml_version
+    assert __version__ == pyproject_version
 
 
 @pytest.fixture
-def jjm_runner():
-    runner = click.testing.CliRunner()
-    return partial(runner.invoke, jjm)
+def jjm_runner(cli_runner, jjm):
+    return partial(cli_runner.invoke, jjm)
 
 
-base_args = [
+base_args = (
     "-d",
     "-C",
     "/tmp",
     "--url",
     "https://yourjenkinsurl.com/",
-]
-overrides_url = {"url": "https://yourjenkinsurl.com/"}
-overrides_none = {}
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_no_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner()
-    assert result.exit_code == 0
-    assert "Usage:" in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_not_called()
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_not_called()
-    handle_validation_errors.assert_not_called()
-    handle_plan_report.assert_not_called()
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_all_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(base_args)
-    assert result.exit_code == 2
-    assert "Usage:" in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_not_called()
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_not_called()
-    handle_validation_errors.assert_not_called()
-    handle_plan_report.assert_not_called()
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_apply_no_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(["apply"])
-    assert result.exit_code == 1
-    assert "ERROR" not in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_called_once_with(overrides_none)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_called_once_with(JenkinsJobManager())
-    handle_validation_errors.assert_called_once_with(JenkinsJobManager())
-    handle_plan_report.assert_called_once_with(JenkinsJobManager(), use_pager=False)
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_apply_all_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(base_args + ["apply"] + ["--target", "bogus", "--auto-approve"])
-    assert result.exit_code == 1
-    assert "ERROR" not in result.output
-    log.setLevel.assert_called_once_with(logging.DEBUG)
-    JenkinsJobManager.assert_called_once_with(overrides_url)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_called_once_with(JenkinsJobManager())
-    handle_validation_errors.assert_called_once_with(JenkinsJobManager())
-    handle_plan_report.assert_called_once_with(JenkinsJobManager(), use_pager=False)
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_check_no_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(["check"])
-    assert result.exit_code == 0
-    assert "ERROR" not in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_called_with(overrides_none)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_not_called()
-    handle_validation_errors.assert_called_once_with(JenkinsJobManager())
-    handle_plan_report.assert_not_called()
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_check_all_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(base_args + ["check", "--load-plugins"])
-    assert result.exit_code == 0
-    assert "ERROR" not in result.output
-    log.setLevel.assert_called_once_with(logging.DEBUG)
-    JenkinsJobManager.assert_called_once_with(overrides_url)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_not_called()
-    handle_plan_report.assert_not_called()
-    handle_validation_errors.assert_called_once_with(JenkinsJobManager())
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_import_no_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(["import"])
-    assert result.exit_code == 0
-    assert "ERROR" not in result.output
-    assert "Imported 0 jobs." in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_called_once_with(overrides_none)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_called_once_with(JenkinsJobManager())
-    handle_validation_errors.assert_not_called()
-    handle_plan_report.assert_not_called()
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_import_all_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(base_args + ["import"] + ["--target", "bogus"])
-    assert result.exit_code == 0
-    assert "ERROR" not in result.output
-    assert "Imported 0 jobs." in result.output
-    log.setLevel.assert_called_once_with(logging.DEBUG)
-    JenkinsJobManager.assert_called_once_with(overrides_url)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_called_once_with(JenkinsJobManager())
-    handle_validation_errors.assert_not_called()
-    handle_plan_report.assert_not_called()
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_login_no_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(["login"])
-    assert result.exit_code == 1
-    assert "ERROR" not in result.output
-    assert "Auth already configured for this jenkins" in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_called_once_with(overrides_none)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_not_called()
-    handle_validation_errors.assert_not_called()
-    handle_plan_report.assert_not_called()
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_plan_no_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    result = jjm_runner(["plan"])
-    assert result.exit_code == 0
-    assert "ERROR" not in result.output
-    log.setLevel.assert_not_called()
-    JenkinsJobManager.assert_called_once_with(overrides_none)
-    JenkinsJobManager.gather.assert_not_called()
-    jjm_check.assert_not_called()
-    check_auth.assert_called_once_with(JenkinsJobManager())
-    handle_validation_errors.assert_called_once_with(JenkinsJobManager())
-    handle_plan_report.assert_called_once_with(
-        JenkinsJobManager(), use_pager=True, output=None
-    )
-
-
-@mock.patch("jenkins_job_manager.cli.log", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_plan_report", autospec=True)
-@mock.patch("jenkins_job_manager.cli.handle_validation_errors", autospec=True)
-@mock.patch("jenkins_job_manager.cli.check_auth", autospec=True)
-@mock.patch("jenkins_job_manager.cli.jjm_check", autospec=True)
-@mock.patch("jenkins_job_manager.cli.JenkinsJobManager", autospec=True)
-def test_jjm_plan_all_args(
-    JenkinsJobManager,
-    jjm_check,
-    check_auth,
-    handle_validation_errors,
-    handle_plan_report,
-    log,
-    jjm_runner,
-):
-    plan_args = ["--skip-pager", "--target", "bogus"]
-    result = jjm_runner(base_args + ["plan"] + plan_args)
-    assert result.exit_code == 0
-    assert "Usage" not in result.output
-    log.setLevel.assert_called_once_with(logging.DEBUG)
-    JenkinsJobManager.assert_called_once_with(overrides_url)
+)
+overrides_url = MappingProxyType({"url": "https://yourjenkinsurl.com/"})
+overrides_none = MappingProxyType({})
+
+
+@attr.s(slots=True, frozen=True)
+class CliCase:
+    """one cli invocation and the calls it should make"""
+
+    name: str = attr.ib()
+    args: tuple = attr.ib()
+    exit_code: int = attr.ib()
+    output_has: tuple = attr.ib(default=())
+    output_lacks: tuple = attr.ib(default=())
+    debug: bool = attr.ib(default=False)
+    # None means JenkinsJobManager is never constructed
+    overrides: Optional[Mapping] = attr.ib(default=None)
+    check_auth: bool = attr.ib(default=False)
+    validation: bool = attr.ib(default=False)
+    # handle_plan_report kwargs, None means not called
+    plan_report: Optional[dict] = attr.ib(default=None)
+
+
+cli_cases = (
+    CliCase("no_args", (), 0, output_has=("Usage:",)),
+    CliCase("all_args", base_args, 2, output_has=("Usage:",)),
+    CliCase(
+        "apply_no_args",
+        ("apply",),
+        1,
+        output_lacks=("ERROR",),
+        overrides=overrides_none,
+        check_auth=True,
+        validation=True,
+        plan_report={"use_pager": False},
+    ),
+    CliCase(
+        "apply_all_args",
+        base_args + ("apply", "--target", "bogus", "--auto-approve"),
+        1,
+        output_lacks=("ERROR",),
+        debug=True,
+        overrides=overrides_url,
+        check_auth=True,
+        validation=True,
+        plan_report={"use_pager": False},
+    ),
+    CliCase(
+        "check_no_args",
+        ("check",),
+        0,
+        output_lacks=("ERROR",),
+        overrides=overrides_none,
+        validation=True,
+    ),
+    CliCase(
+        "check_all_args",
+        base_args + ("check", "--load-plugins"),
+        0,
+        output_lacks=("ERROR",),
+        debug=True,
+        overrides=overrides_url,
+        validation=True,
+    ),
+    CliCase(
+        "import_no_args",
+        ("import",),
+        0,
+        output_has=("Imported 0 jobs.",),
+        output_lacks=("ERROR",),
+        overrides=overrides_none,
+        check_auth=True,
+    ),
+    CliCase(
+        "import_all_args",
+        base_args + ("import", "--target", "bogus"),
+        0,
+        output_has=("Imported 0 jobs.",),
+        output_lacks=("ERROR",),
+        debug=True,
+        overrides=overrides_url,
+        check_auth=True,
+    ),
+    CliCase(
+        "login_no_args",
+        ("login",),
+        1,
+        output_has=("Auth already configured for this jenkins",),
+        output_lacks=("ERROR",),
+        overrides=overrides_none,
+    ),
+    CliCase(
+        "plan_no_args",
+        ("plan",),
+        0,
+        output_lacks=("ERROR",),
+        overrides=overrides_none,
+        check_auth=True,
+        validation=True,
+        plan_report={"use_pager": True, "output": None},
+    ),
+    CliCase(
+        "plan_all_args",
+        base_args + ("plan", "--skip-pager", "--target", "bogus"),
+        0,
+        output_lacks=("Usage",),
+        debug=True,
+        overrides=overrides_url,
+        check_auth=True,
+        validation=True,
+        plan_report={"use_pager": False, "output": None},
+    ),
+)
+
+
+@pytest.mark.parametrize("case", cli_cases, ids=map(attrgetter("name"), cli_cases))
+def test_jjm(case: CliCase, cli_mocks, jjm_runner):
+    (
+        JenkinsJobManager,
+        jjm_check,
+        check_auth,
+        handle_validation_errors,
+        handle_plan_report,
+        log,
+    ) = cli_mocks
+    result = jjm_runner(case.args)
+    assert result.exit_code == case.exit_code
+    for text in case.output_has:
+        assert text in result.output
+    for text in case.output_lacks:
+        assert text not in result.output
+
+    if case.debug:
+        log.setLevel.assert_called_once_with(logging.DEBUG)
+    else:
+        log.setLevel.assert_not_called()
+    if case.overrides is None:
+        JenkinsJobManager.assert_not_called()
+    else:
+        JenkinsJobManager.assert_called_once_with(case.overrides)
     JenkinsJobManager.gather.assert_not_called()
     jjm_check.assert_not_called()
-    check_auth.assert_called_once_with(JenkinsJobManager())
-    handle_validation_errors.assert_called_once_with(JenkinsJobManager())
-    handle_plan_report.assert_called_once_with(
-        JenkinsJobManager(), use_pager=False, output=None
-    )
+    # return_value is what the cli got, without recording another call
+    manager = JenkinsJobManager.return_value
+    if case.check_auth:
+        check_auth.assert_called_once_with(manager)
+    else:
+        check_auth.assert_not_called()
+    if case.validation:
+        handle_validation_errors.assert_called_once_with(manager)
+    else:
+        handle_validation_errors.assert_not_called()
+    if case.plan_report is None:
+        handle_plan_report.assert_not_called()
+    else:
+        handle_plan_report.assert_called_once_with(manager, **case.plan_report)
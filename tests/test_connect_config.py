@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from jenkins_job_manager import connect_config
+from jenkins_job_manager.connect_config import JenkinsConnectConfig
+
+URL = "https://jenkins.example"
+
+
+@pytest.fixture
+def conf_dir(tmp_path, monkeypatch):
+    """config paths pointed into tmp_path, jjm.ini is read from the cwd"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        JenkinsConnectConfig, "global_conf_path", str(tmp_path / "global.ini")
+    )
+    monkeypatch.setattr(
+        JenkinsConnectConfig, "user_conf_path", str(tmp_path / "user/creds.ini")
+    )
+    return tmp_path
+
+
+def write_ini(path, text, mtime_ns):
+    """write a config file with an explicit mtime, edits can land in one tick"""
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_edited_jjm_ini_is_reparsed(conf_dir):
+    ini = conf_dir / "jjm.ini"
+    write_ini(ini, f"[jenkins]\nurl = {URL}\nusername = first\n", 10**18)
+    assert JenkinsConnectConfig.load_from_files().username == "first"
+    # unchanged files come from the cache
+    assert JenkinsConnectConfig.load_from_files().username == "first"
+
+    write_ini(ini, f"[jenkins]\nurl = {URL}\nusername = second\n", 10**18 + 1)
+    assert JenkinsConnectConfig.load_from_files().username == "second"
+
+
+def test_update_user_conf_auth_bumps_version(conf_dir):
+    write_ini(conf_dir / "jjm.ini", f"[jenkins]\nurl = {URL}\n", 10**18)
+    config = JenkinsConnectConfig.load_from_files()
+    assert config.username is None
+
+    version = connect_config._config_version
+    config.update_user_conf_auth("someone", "secret")
+    assert connect_config._config_version == version + 1
+
+    reloaded = JenkinsConnectConfig.load_from_files()
+    assert (reloaded.username, reloaded.password) == ("someone", "secret")
+
+
+@pytest.mark.parametrize(
+    "url_section,expected",
+    [
+        ("username = peruser\npassword = perpass\n", ("peruser", "perpass")),
+        # empty per-url values fall back to [jenkins]
+        ("username =\npassword = perpass\n", ("base", "perpass")),
+        ("", ("base", "basepass")),
+    ],
+)
+def test_per_url_values_win(conf_dir, url_section, expected):
+    write_ini(
+        conf_dir / "jjm.ini",
+        f"[jenkins]\nurl = {URL}/\nusername = base\npassword = basepass\n"
+        f"\n[{URL}]\n{url_section}",
+        10**18,
+    )
+    config = JenkinsConnectConfig.load_from_files()
+    assert config.url == URL
+    assert (config.username, config.password) == expected
+
+
+def test_overrides_win_over_files(conf_dir):
+    write_ini(conf_dir / "jjm.ini", "[jenkins]\nurl = https://from.file\n", 10**18)
+    config = JenkinsConnectConfig.load_from_files({"url": URL})
+    assert config.url == URL
+
+
+def test_metadata_reads_required_fields_only(conf_dir):
+    write_ini(
+        conf_dir / "jjm.ini",
+        f"[jenkins]\nurl = {URL}\n\n[metadata]\n"
+        "required-description-fields = owner team\n"
+        "valid-values-for-owner = alice 'bob smith'\n"
+        "valid-values-for-unrequired = nope\n",
+        10**18,
+    )
+    metadata = JenkinsConnectConfig.load_from_files().metadata
+    assert metadata.required_fields == ["owner", "team"]
+    assert metadata.valid_field_values == {"owner": ["alice", "bob smith"]}
+    assert "valid-values-for-unrequired" not in metadata.metadata_conf
+
+
+@pytest.mark.parametrize("parallelism", ["0", "-1", "abc"])
+def test_parallelism_must_be_positive(conf_dir, parallelism):
+    write_ini(
+        conf_dir / "jjm.ini",
+        f"[jenkins]\nurl = {URL}\nparallelism = {parallelism}\n",
+        10**18,
+    )
+    with pytest.raises(ValueError, match="parallelism must be"):
+        JenkinsConnectConfig.load_from_files()
+
+
+def test_parallelism(conf_dir):
+    write_ini(conf_dir / "jjm.ini", f"[jenkins]\nurl = {URL}\n", 10**18)
+    assert JenkinsConnectConfig.load_from_files().parallelism is None
+    config = JenkinsConnectConfig.load_from_files({"parallelism": "4"})
+    assert config.parallelism == 4
@@ -0,0 +1,270 @@
+import fnmatch
+import logging
+import os
+import re
+import time
+
+import pytest
+
+from jenkins_job_manager.connect_config import JenkinsConnectConfig
+from jenkins_job_manager.core import JenkinsJobManager, NameRegexFilter, _yaml_dirs
+from jenkins_job_manager.jenkins_client import JenkinsClient
+from jenkins_job_manager.xml_change import CREATE, UPDATE, DELETE
+
+
+class RecordingJenkins:
+    """a fake jenkins client recording the writes apply_plan makes"""
+
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, method, name):
+        self.calls.append((method, name))
+
+    def create_view(self, name, config_xml):
+        self._record("create_view", name)
+
+    def reconfig_view(self, name, config_xml):
+        self._record("reconfig_view", name)
+
+    def delete_view(self, name):
+        self._record("delete_view", name)
+
+    def create_job(self, name, config_xml):
+        self._record("create_job", name)
+
+    def reconfig_job(self, name, config_xml):
+        self._record("reconfig_job", name)
+
+    def delete_job(self, name):
+        self._record("delete_job", name)
+
+    def index(self, method, name):
+        return self.calls.index((method, name))
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """a JenkinsJobManager reading no config files but the overrides"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        JenkinsConnectConfig, "global_conf_path", str(tmp_path / "global.ini")
+    )
+    monkeypatch.setattr(
+        JenkinsConnectConfig, "user_conf_path", str(tmp_path / "user.ini")
+    )
+    jjm = JenkinsJobManager({"url": "https://jenkins.example"})
+    jjm._jenkins = RecordingJenkins()
+    return jjm
+
+
+created_jobs = ("fold", "fold/a", "fold/b", "fold/b/c")
+deleted_jobs = ("old", "old/a", "old/b", "old/b/c")
+
+
+@pytest.fixture
+def planned(manager):
+    """a plan creating, updating and deleting nested folders and a view"""
+    for name in created_jobs:
+        manager.jobs[name].after_xml = "<project/>"
+    for name in deleted_jobs:
+        manager.jobs[name].before_xml = "<project/>"
+    manager.jobs["kept"].before_xml = "<project><a/></project>"
+    manager.jobs["kept"].after_xml = "<project><b/></project>"
+    manager.jobs["same"].before_xml = "<project/>"
+    manager.jobs["same"].after_xml = "<project/>"
+    manager.views["myview"].after_xml = "<hudson.model.ListView/>"
+    manager.views["oldview"].before_xml = "<hudson.model.ListView/>"
+    return manager
+
+
+def test_apply_plan_changecounts(planned):
+    planned.config.allow_delete = True
+    changecounts, msg = planned.apply_plan()
+    assert changecounts == {CREATE: 5, UPDATE: 1, DELETE: 5}
+    assert msg == "Changes applied. added=5 updated=1 deleted=5"
+    calls = planned.jenkins.calls
+    assert len(calls) == 11
+    assert ("reconfig_job", "kept") in calls
+    assert not any(name == "same" for _, name in calls)
+
+
+def test_apply_plan_views_before_jobs(planned):
+    planned.config.allow_delete = True
+    planned.apply_plan()
+    methods = [method for method, _ in planned.jenkins.calls]
+    last_view = max(i for i, method in enumerate(methods) if method.endswith("_view"))
+    first_job = min(i for i, method in enumerate(methods) if method.endswith("_job"))
+    assert last_view < first_job
+
+
+def test_apply_plan_folder_order(planned):
+    """parents are created before children, children are deleted before parents"""
+    planned.config.allow_delete = True
+    planned.apply_plan()
+    fake = planned.jenkins
+    for parent, child in (
+        ("fold", "fold/a"),
+        ("fold", "fold/b"),
+        ("fold/b", "fold/b/c"),
+    ):
+        assert fake.index("create_job", parent) < fake.index("create_job", child)
+    for parent, child in (("old", "old/a"), ("old", "old/b"), ("old/b", "old/b/c")):
+        assert fake.index("delete_job", child) < fake.index("delete_job", parent)
+
+
+def test_apply_plan_refuses_delete(planned, caplog):
+    planned.config.allow_delete = False
+    with caplog.at_level(logging.WARNING, logger="jjm"):
+        changecounts, _ = planned.apply_plan()
+    calls = planned.jenkins.calls
+    assert not any(method.startswith("delete_") for method, _ in calls)
+    # the plan still counts them, as before
+    assert changecounts[DELETE] == 5
+    assert "refusing to delete view oldview" in caplog.text
+    for name in deleted_jobs:
+        assert f"refusing to delete job {name}" in caplog.text
+
+
+class FailingJenkins(RecordingJenkins):
+    """fails to create the job named fail, takes a while to create slow"""
+
+    def create_job(self, name, config_xml):
+        super().create_job(name, config_xml)
+        if name == "slow":
+            time.sleep(0.1)
+        elif name == "fail":
+            raise RuntimeError(f"could not create {name}")
+
+
+def test_apply_plan_stops_batch_on_failure(manager, monkeypatch):
+    """
+    a failure stops the rest of its batch, even while an earlier item in the
+    batch is still being applied
+    """
+    monkeypatch.setattr(JenkinsJobManager, "apply_workers", 2)
+    manager._jenkins = FailingJenkins()
+    for name in ("slow", "fail", "later1", "later2", "fold/child"):
+        manager.jobs[name].after_xml = "<project/>"
+    with pytest.raises(RuntimeError, match="could not create fail"):
+        manager.apply_plan()
+    assert sorted(manager.jenkins.calls) == [
+        ("create_job", "fail"),
+        ("create_job", "slow"),
+    ]
+
+
+def _job(fullname, _class="hudson.model.FreeStyleProject", jobs=None):
+    job = {
+        "name": fullname.rpartition("/")[2],
+        "url": "https://jenkins.example/job/" + fullname.replace("/", "/job/"),
+        "_class": _class,
+    }
+    if jobs is not None:
+        job["jobs"] = jobs
+    return job
+
+
+def test_read_jobs_skips_managed_children(manager, monkeypatch):
+    """
+    jobs under a managing folder the filter targets belong to that folder,
+    managing folders the filter doesn't target are still walked
+    """
+    org_folder = "jenkins.branch.OrganizationFolder"
+    top_jobs = [
+        _job("org", org_folder, [_job("org/repo")]),
+        _job("other", org_folder, [_job("other/x")]),
+    ]
+    client = JenkinsClient("https://jenkins.example")
+    monkeypatch.setattr(
+        client, "get_info", lambda item="", query=None: {"jobs": top_jobs}
+    )
+    monkeypatch.setattr(client, "get_job_config", lambda name: "<project/>")
+    manager._jenkins = client
+    manager._jobs_filter_func = NameRegexFilter.from_glob_list(
+        ["org", "org/*", "other/*"]
+    )
+    manager.read_jobs()
+    assert sorted(manager.jobs) == ["org", "other/x"]
+
+
+def test_yaml_dirs(tmp_path, monkeypatch):
+    for rel in (
+        "top.yml",
+        "sub/b.yaml",
+        "sub/notyaml/c.txt",
+        "sub/notyaml/deepest/d.yml",
+        ".hidden/e.yml",
+        "locked/f.yml",
+        "other/g.yaml.bak",
+    ):
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    (tmp_path / "empty").mkdir()
+
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if os.path.basename(path) == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    monkeypatch.chdir(tmp_path)
+    dirs = list(_yaml_dirs("."))
+    assert sorted(dirs) == [".", "./sub", "./sub/notyaml/deepest"]
+    # depth first, parents before their children
+    assert dirs.index("./sub") < dirs.index("./sub/notyaml/deepest")
+
+
+filter_names = (
+    "a.b",
+    "axb",
+    "a.bc",
+    "job",
+    "job1",
+    "jobs/x",
+    "fold",
+    "fold/a",
+    "fold/a/b",
+    "x1",
+    "x3",
+    "q",
+    "",
+)
+
+
+@pytest.mark.parametrize(
+    "globs",
+    [
+        ["a.b"],
+        ["job", "fold/a"],
+        ["job*"],
+        ["x[12]", "?"],
+        ["a.b", "job*", "fold/*", "fold"],
+    ],
+)
+def test_glob_list_filter_matches_fnmatch(globs):
+    """split literal/regex matching agrees with one combined fnmatch regex"""
+    combined = re.compile("|".join(map(fnmatch.translate, globs)))
+    name_filter = NameRegexFilter.from_glob_list(globs)
+    for name in filter_names:
+        assert name_filter(name) is (combined.match(name) is not None), name
+
+
+def test_glob_list_filter_memoized():
+    assert NameRegexFilter.from_glob_list(["a", "b*"]) is (
+        NameRegexFilter.from_glob_list(iter(["a", "b*"]))
+    )
+
+
+def test_name_regex_filter_repr():
+    assert repr(NameRegexFilter.from_glob_list(["b", "a.b"])) == (
+        "NameRegexFilter<None, ['a.b', 'b']>"
+    )
+    assert repr(NameRegexFilter(".*")) == "NameRegexFilter<'.*'>"
+    literals_and_glob = NameRegexFilter.from_glob_list(["a", "b*"])
+    assert repr(literals_and_glob) == (
+        f"NameRegexFilter<{fnmatch.translate('b*')!r}, ['a']>"
+    )
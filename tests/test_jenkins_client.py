@@ -0,0 +1,136 @@
+import json
+
+import jenkins
+import pytest
+import requests.exceptions
+
+from jenkins_job_manager import jenkins_client
+from jenkins_job_manager.jenkins_client import JenkinsClient, PLUGINS_QUERY
+
+URL = "https://jenkins.example"
+
+
+class FakeResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+@pytest.fixture
+def client():
+    return JenkinsClient(URL)
+
+
+def stub_get_info(client, monkeypatch, responses: dict):
+    """serve get_info from responses keyed by item, recording each call"""
+    calls = []
+
+    def get_info(item="", query=None):
+        calls.append((item, query))
+        return responses[item]
+
+    monkeypatch.setattr(client, "get_info", get_info)
+    return calls
+
+
+def stub_jenkins_request(client, monkeypatch, content=None, error=None):
+    """answer every request with content, or raise error, recording the urls"""
+    urls = []
+
+    def jenkins_request(req, *args, **kwargs):
+        urls.append(req.url)
+        if error is not None:
+            raise error
+        return FakeResponse(content)
+
+    monkeypatch.setattr(client, "jenkins_request", jenkins_request)
+    return urls
+
+
+@pytest.mark.parametrize(
+    "depth_per_request,expected",
+    [
+        (1, "?tree=jobs[name,url,jobs]"),
+        (2, "?tree=jobs[name,url,jobs[name,url,jobs]]"),
+    ],
+)
+def test_get_all_jobs_query(client, monkeypatch, depth_per_request, expected):
+    calls = stub_get_info(client, monkeypatch, {"": {"jobs": []}})
+    assert client.get_all_jobs(folder_depth_per_request=depth_per_request) == []
+    assert calls == [("", expected)]
+
+
+def test_get_all_jobs_fullname(client, monkeypatch):
+    folder = {
+        "name": "fold",
+        "url": f"{URL}/job/fold/",
+        "jobs": [{"name": "a", "url": f"{URL}/job/fold/job/a/"}],
+    }
+    stub_get_info(client, monkeypatch, {"": {"jobs": [folder]}})
+    jobs = client.get_all_jobs()
+    assert [job["fullname"] for job in jobs] == ["fold", "fold/a"]
+
+
+def test_get_all_jobs_single_job_object(client, monkeypatch):
+    """jenkins can hand back a lone job as an object instead of a list"""
+    stub_get_info(client, monkeypatch, {"": {"jobs": {"name": "a", "url": URL}}})
+    assert [job["fullname"] for job in client.get_all_jobs()] == ["a"]
+
+
+def test_get_all_jobs_requery_past_depth_per_request(client, monkeypatch):
+    """past folder_depth_per_request jenkins returns empty objects"""
+    responses = {
+        "": {"jobs": [{"name": "fold", "url": f"{URL}/job/fold/", "jobs": [{}]}]},
+        "/job/fold": {"jobs": [{"name": "a", "url": f"{URL}/job/fold/job/a/"}]},
+    }
+    calls = stub_get_info(client, monkeypatch, responses)
+    jobs = client.get_all_jobs(folder_depth_per_request=1)
+    assert [job["fullname"] for job in jobs] == ["fold", "fold/a"]
+    query = "?tree=jobs[name,url,jobs]"
+    assert calls == [("", query), ("/job/fold", query)]
+
+
+def test_get_all_jobs_folder_depth(client, monkeypatch):
+    folder = {
+        "name": "fold",
+        "url": f"{URL}/job/fold/",
+        "jobs": [
+            {
+                "name": "sub",
+                "url": f"{URL}/job/fold/job/sub/",
+                "jobs": [{"name": "a", "url": f"{URL}/job/fold/job/sub/job/a/"}],
+            }
+        ],
+    }
+    stub_get_info(client, monkeypatch, {"": {"jobs": [folder]}})
+    jobs = client.get_all_jobs(folder_depth=1)
+    assert [job["fullname"] for job in jobs] == ["fold", "fold/sub"]
+
+
+@pytest.mark.parametrize("decoder", ["json", "orjson"])
+def test_get_info_decode_error(client, monkeypatch, decoder):
+    loads = json.loads if decoder == "json" else pytest.importorskip("orjson").loads
+    monkeypatch.setattr(jenkins_client, "json_loads", loads)
+    stub_jenkins_request(client, monkeypatch, content=b"<html>not json</html>")
+    with pytest.raises(jenkins.JenkinsException, match="Could not parse JSON"):
+        client.get_info()
+    with pytest.raises(jenkins.JenkinsException, match="Could not parse JSON"):
+        client.get_plugins_list()
+
+
+def test_get_info_http_error(client, monkeypatch):
+    stub_jenkins_request(
+        client, monkeypatch, error=requests.exceptions.HTTPError("500")
+    )
+    with pytest.raises(jenkins.BadHTTPException):
+        client.get_info()
+    with pytest.raises(jenkins.BadHTTPException):
+        client.get_plugins_list()
+
+
+def test_get_plugins_list(client, monkeypatch):
+    plugins = [{"shortName": "git", "longName": "Git plugin", "version": "4.11"}]
+    urls = stub_jenkins_request(
+        client, monkeypatch, content=json.dumps({"plugins": plugins}).encode()
+    )
+    assert client.get_plugins_list() == plugins
+    assert urls == [f"{URL}/{PLUGINS_QUERY}"]
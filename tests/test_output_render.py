@@ -1,4 +1,3 @@
-import os
 import pathlib
 from unittest import mock
 from operator import attrgetter
@@ -7,10 +6,8 @@ import json
 import attr
 import pytest
 import yaml
-from click.testing import CliRunner
-from jenkins_job_manager.cli import jjm
 
-HERE = os.path.dirname(os.path.realpath(__file__))
+HERE = pathlib.Path(__file__).resolve().parent
 
 
 class FakeJenkins:
@@ -23,6 +20,9 @@ class FakeJenkins:
     def __init__(self, views=None, jobs=None):
         self.views: list = views or []
         self.jobs: list = jobs or []
+        # reversed so the first entry wins on duplicate names, like a scan would
+        self._views_by_name = {d["name"]: d for d in reversed(self.views)}
+        self._jobs_by_name = {d["name"]: d for d in reversed(self.jobs)}
 
     def ini_conf(self):
         return f"""\
@@ -35,8 +35,8 @@ password = {self._password}
     def get_whoami(self):
         return {"id": self._username}
 
-    def get_plugins(self):
-        return {}
+    def get_plugins_list(self):
+        return []
 
     def get_views(self):
         return (
@@ -49,12 +49,10 @@ password = {self._password}
         )
 
     def get_view_config(self, name):
-        for d in self.views:
-            if d["name"] == name:
-                return d["xml"]
-        return None
+        d = self._views_by_name.get(name)
+        return None if d is None else d["xml"]
 
-    def get_all_jobs(self):
+    def get_all_jobs(self, descend=None):
         return (
             {
                 "fullname": d["name"],
@@ -65,10 +63,8 @@ password = {self._password}
         )
 
     def get_job_config(self, name):
-        for d in self.jobs:
-            if d["name"] == name:
-                return d["xml"]
-        return None
+        d = self._jobs_by_name.get(name)
+        return None if d is None else d["xml"]
 
 
 @attr.s(slots=True, frozen=True)
@@ -83,21 +79,29 @@ class JCase:
 
 
 def _test_cases():
-    with open(f"{HERE}/test_output_render.yml") as fp:
-        test_cases = yaml.safe_load_all(fp)
+    # libyaml's loader when available, the cases file is the bulk of collection
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(HERE / "test_output_render.yml") as fp:
+        test_cases = yaml.load_all(fp, Loader=loader)
         for test_case in filter(bool, test_cases):
             yield JCase(**test_case)
 
 
+TEST_CASES = tuple(_test_cases())
+
+
 @pytest.mark.parametrize(
-    "test_case", _test_cases(), ids=map(attrgetter("name"), _test_cases())
+    "test_case", TEST_CASES, ids=map(attrgetter("name"), TEST_CASES)
 )
-def test_jjm_default_plan_output(test_case: JCase):
+def test_jjm_default_plan_output(
+    test_case: JCase, cli_runner, jjm, tmp_path, monkeypatch
+):
     fake_jenkins = FakeJenkins(**test_case.remote)
     mfj = mock.patch("jenkins_job_manager.core.JenkinsJobManager.jenkins", fake_jenkins)
-    runner = CliRunner()
+    runner = cli_runner
+    monkeypatch.chdir(tmp_path)
 
-    with mfj, runner.isolated_filesystem():
+    with mfj:
         pathlib.Path("./jjm.ini").write_text(fake_jenkins.ini_conf())
         pathlib.Path("./job.yml").write_text(test_case.local)
 
@@ -1,4 +1,7 @@
+import difflib
 import unittest.mock as mock
+import xml.etree.ElementTree as ET
+
 import pytest
 
 from jenkins_job_manager.xml_change import (
@@ -7,6 +10,7 @@ from jenkins_job_manager.xml_change import (
     DELETE,
     XmlChange,
     XmlChangeDefaultDict,
+    _unified_diff,
 )
 
 
@@ -67,24 +71,39 @@ def test_XmlChange_changetype(before, after, changetype):
     assert xc.changetype() is changetype
 
 
+def test_XmlChange_changetype_reset():
+    """the memoized changetype is reset by the setters"""
+    xc = XmlChange("something")
+    assert xc.changetype() is None
+    xc.after_xml = "<project/>"
+    assert xc.changetype() is CREATE
+    xc.before_xml = "<project/>"
+    assert xc.changetype() is None
+
+
+def test_XmlChange_unchanged_shares_xml():
+    xc = XmlChange("something")
+    xc.before_xml = "<project>\n  <a/>\n</project>"
+    xc.after_xml = "<project><a/></project>"
+    assert xc.before_xml is xc.after_xml
+
+
 _difflines_params = (
     (
         "death of a salesman",
         "<project/>",
         "<project><something>Nobody</something></project>",
-        """\
---- death of a salesman
-
-+++ death of a salesman
-
-@@ -1,2 +1,4 @@
-
- <?xml version="1.0" ?>
--<project/>
-+<project>
-+  <something>Nobody</something>
-+</project>
-""",
+        [
+            # unified_diff control lines keep their lineterm
+            "--- death of a salesman\n",
+            "+++ death of a salesman\n",
+            "@@ -1,2 +1,4 @@\n",
+            ' <?xml version="1.0" ?>',
+            "-<project/>",
+            "+<project>",
+            "+  <something>Nobody</something>",
+            "+</project>",
+        ],
     ),
 )
 
@@ -97,6 +116,82 @@ def test_XmlChange_difflines(name, before, after, result):
         xc.before_xml = before
     if after is not None:
         xc.after_xml = after
-    rendered = "\n".join(xc.difflines())
-    expected_lines = result.rstrip()
-    assert rendered == expected_lines
+    assert list(xc.difflines()) == result
+
+
+def test_difflib_left_alone():
+    assert difflib.SequenceMatcher.__module__ == "difflib"
+
+
+@pytest.mark.parametrize(
+    "before,after",
+    [
+        (("a", "b", "c"), ("a", "x", "c")),
+        (tuple("abcdefghijklmnop"), tuple("abXdefghijklmnYp")),
+        (("a", "b"), ()),
+        ((), ("a",)),
+        (("a",), ("a",)),
+    ],
+)
+def test_unified_diff_matches_difflib(before, after):
+    expected = difflib.unified_diff(before, after, fromfile="job", tofile="job")
+    assert list(_unified_diff(before, after, "job")) == list(expected)
+
+
+_xml_normalize_params = (
+    ("<project/>", '<?xml version="1.0" ?>\n<project/>\n'),
+    (
+        "<project><b/><!-- note --> <a x='1'/></project>",
+        '<?xml version="1.0" ?>\n<project>\n  <!-- note -->\n  <a x="1"/>\n  <b/>\n</project>\n',
+    ),
+    (
+        "<project>\n  <b> text </b>\n  <a/>\n</project>",
+        '<?xml version="1.0" ?>\n<project>\n  <a/>\n  <b>text</b>\n</project>\n',
+    ),
+    (
+        "<view><b/><a/></view>",
+        '<?xml version="1.0" ?>\n<view>\n  <b/>\n  <a/>\n</view>\n',
+    ),
+)
+
+
+@pytest.mark.parametrize("xml_str,expected", _xml_normalize_params)
+def test_XmlChange_xml_normalize(xml_str, expected):
+    """blank text is stripped, only sortable nodes are sorted"""
+    assert XmlChange.xml_normalize(xml_str) == expected
+
+
+@pytest.mark.parametrize("xml_str,expected", _xml_normalize_params)
+def test_XmlChange_after_from_element(xml_str, expected):
+    """normalizing an ElementTree element matches normalizing its xml string"""
+    xc = XmlChange("something")
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    xc.after_from_element(ET.fromstring(xml_str, parser=parser))
+    assert xc.after_xml == expected
+
+
+_extract_md_xml = """<project>
+<builders><x><description>Team: Nested</description></x></builders>
+<description>A test job
+
+Team: Test
+  owner-team: a-b
+email: a-b@example.com
+&lt;!-- Managed by Jenkins Job Builder --&gt;</description></project>"""
+
+
+def test_XmlChange_extract_md():
+    xc = XmlChange("something")
+    xc.after_xml = _extract_md_xml
+    assert xc.extract_md() == {"Team": "Test", "owner-team": "a-b"}
+    assert xc.extract_md() is xc.extract_md()
+    xc.after_xml = "<project/>"
+    assert xc.extract_md() == {}
+
+
+def test_XmlChange_extract_md_from_element():
+    xc = XmlChange("something")
+    xc.after_from_element(ET.fromstring(_extract_md_xml))
+    with mock.patch.object(ET, "iterparse") as iterparse:
+        assert xc.extract_md() == {"Team": "Test", "owner-team": "a-b"}
+    iterparse.assert_not_called()